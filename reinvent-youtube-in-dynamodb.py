@@ -0,0 +1,1251 @@
+# -*- coding: utf-8 -*-
+
+"""
+Reinvent YouTube in DynamoDB.
+
+This script is a standalone version of the modeling workflow described in
+``Example.ipynb``. It models the core YouTube domain — user, video, channel,
+playlist — plus one-to-many ownership and many-to-many association
+relationships, all in a single DynamoDB table.
+
+Key design:
+
+- every entity item uses ``pk = {entity_id}``, ``sk = ROOT``.
+- one-to-many relationship items use ``pk = {many_id}_{TYPE}``,
+  ``sk = {one_id}_{TYPE}``.
+- many-to-many relationship items use ``pk = {left_id}``,
+  ``sk = {TYPE}#{right_id}`` — the type is encoded once, on the sort-key
+  axis only, instead of being stored twice per row.
+- the ``LookupIndex`` GSI inverts pk / sk so we can query a relationship
+  from either side.
+"""
+
+import os
+import sys
+import typing as T
+import operator
+import itertools
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import cached_property
+from zlib import crc32
+
+import dataclasses
+import pynamodb_mate.api as pm
+# use moto to mock DynamoDB, it is an in-memory implementation of DynamoDB
+# set USE_MOTO=0 to run against real DynamoDB with your default AWS credential
+USE_MOTO = os.environ.get("USE_MOTO", "1") == "1"
+if USE_MOTO:
+    # lazy import: production processes never even load moto
+    from moto import mock_aws
+
+    mock = mock_aws()
+    mock.start()
+
+# create a DynamoDB connection, ensure that your default AWS credential is right
+# if you are using mock, then this line always works.
+# one long-lived connection with a pool sized for the parallel batch / shard
+# reads, and adaptive retries with exponential backoff to absorb
+# UnprocessedItems / throttling bursts
+connect = pm.Connection(
+    region="us-east-1",
+    # fail fast on dead sockets instead of waiting out the 60s defaults;
+    # the pooled keep-alive connections make retries cheap
+    connect_timeout_seconds=1,
+    read_timeout_seconds=5,
+    max_pool_connections=50,
+    retry_configuration={"max_attempts": 10, "mode": "adaptive"},
+)
+
+# indicate that this item only has hash key, range key is not used (logically)
+ROOT = "--root--"
+
+
+class TypeEnum:
+    """
+    Enumerate the three categories of item stored in the table.
+
+    The values are interned constants so call sites can compare them with
+    ``is`` instead of string equality.
+    """
+
+    entity = sys.intern("entity")
+    o2m = sys.intern("o2m")  # one-to-many relationship
+    m2m = sys.intern("m2m")  # many-to-many relationship
+
+
+class LookupIndex(pm.GlobalSecondaryIndex):
+    """
+    Invert the pk / sk of the main table, so that we can query a relationship
+    item from the other side.
+
+    The only attributes consumers read from this index are the keys
+    themselves (``pk_id`` / ``sk_id``), so KEYS_ONLY projection is enough —
+    an ALL projection would double the storage and the WCU cost of every
+    write for attributes nobody reads from the index.
+    """
+
+    class Meta:
+        index_name = "lookup-index"
+        projection = pm.KeysOnlyProjection()
+
+    sk: pm.REQUIRED_STR = pm.UnicodeAttribute(hash_key=True)
+    pk: pm.REQUIRED_STR = pm.UnicodeAttribute(range_key=True)
+
+
+class TypeIndex(pm.GlobalSecondaryIndex):
+    """
+    Query all items of one type directly. A Scan with a type filter reads
+    (and bills) every partition in the table; this index makes the same
+    listing a targeted Query that only touches matching items.
+    """
+
+    class Meta:
+        index_name = "type-index"
+        projection = pm.KeysOnlyProjection()
+
+    type: pm.REQUIRED_STR = pm.UnicodeAttribute(hash_key=True)
+    pk: pm.REQUIRED_STR = pm.UnicodeAttribute(range_key=True)
+
+
+class Entity(pm.Model):
+    """
+    The main DynamoDB table data model definition. Both entity items and
+    relationship items are stored in this table.
+    """
+
+    class Meta:
+        table_name = "entity"
+        region = "us-east-1"
+        billing_mode = pm.constants.PAY_PER_REQUEST_BILLING_MODE
+        # keep the HTTP connection pool at least as large as the read
+        # fan-out, so parallel BatchGetItem chunks don't starve each other
+        connect_timeout_seconds = 1
+        read_timeout_seconds = 5
+        max_pool_connections = 50
+        max_retry_attempts = 10
+
+    pk: pm.REQUIRED_STR = pm.UnicodeAttribute(hash_key=True)
+    sk: pm.REQUIRED_STR = pm.UnicodeAttribute(range_key=True)
+    type: pm.OPTIONAL_STR = pm.UnicodeAttribute(default=None, null=True)
+    name: pm.OPTIONAL_STR = pm.UnicodeAttribute(default=None, null=True)
+    # display names denormalized onto many-to-many rows at link time, so a
+    # relationship query returns rendering-ready data without a follow-up
+    # GetItem per row; immutable-ish fields only (partial normalization)
+    left_name: pm.OPTIONAL_STR = pm.UnicodeAttribute(default=None, null=True)
+    right_name: pm.OPTIONAL_STR = pm.UnicodeAttribute(default=None, null=True)
+
+    lookup_index = LookupIndex()
+    type_index = TypeIndex()
+
+    @cached_property
+    def pk_id(self) -> str:
+        """
+        The entity id encoded in the partition key, e.g. ``v-1`` in
+        ``v-1_VIDEO-OWNERSHIP``.
+
+        ``str.partition`` avoids the throw-away list that ``str.split``
+        allocates, and the result is memoized in ``__dict__`` because the
+        verification / print loops hit these properties repeatedly.
+        """
+        return self.pk.partition("_")[0].partition("#")[0]
+
+    @cached_property
+    def sk_id(self) -> str:
+        """
+        The entity id encoded in the sort key: the part after ``#`` for
+        ``{TYPE}#{right_id}`` many-to-many keys, the part before ``_`` for
+        one-to-many keys.
+        """
+        before, sep, after = self.sk.partition("#")
+        if sep:
+            return after
+        return before.partition("_")[0]
+
+    def print(self):
+        print(f"pk = {self.pk!r}, sk = {self.sk!r}, type = {self.type!r}, name = {self.name!r}")
+
+
+T_Entity = T.TypeVar("T_Entity", bound=Entity)
+
+
+_pk_id_alias = property(operator.attrgetter("pk_id"))
+_sk_id_alias = property(operator.attrgetter("sk_id"))
+
+
+def _entity_cls(
+    name: str,
+    pk_alias: T.Optional[str] = None,
+    sk_alias: T.Optional[str] = None,
+) -> T.Type[Entity]:
+    """
+    Build an :class:`Entity` subclass whose only specialization is one or
+    two id-alias properties. The eleven concrete item classes differ by
+    nothing else, so generating them here shares the two alias descriptors
+    across all classes and skips ten hand-written class bodies (every
+    pm.Model subclass pays a metaclass attribute walk at import).
+    """
+    attrs = {}
+    if pk_alias:
+        attrs[pk_alias] = _pk_id_alias
+    if sk_alias:
+        attrs[sk_alias] = _sk_id_alias
+    return type(Entity)(name, (Entity,), attrs)
+
+
+# entity items
+User = _entity_cls("User", pk_alias="user_id")
+Video = _entity_cls("Video", pk_alias="video_id")
+Channel = _entity_cls("Channel", pk_alias="channel_id")
+Playlist = _entity_cls("Playlist", pk_alias="playlist_id")
+
+# one-to-many relationship items, pk is the "many" side, sk is the "one" side
+VideoOwnership = _entity_cls("VideoOwnership", "video_id", "user_id")
+ChannelOwnership = _entity_cls("ChannelOwnership", "channel_id", "user_id")
+PlaylistOwnership = _entity_cls("PlaylistOwnership", "playlist_id", "user_id")
+
+# many-to-many relationship items, pk is the "left" side, sk is the "right" side
+VideoChannelAssociation = _entity_cls("VideoChannelAssociation", "video_id", "channel_id")
+VideoPlaylistAssociation = _entity_cls("VideoPlaylistAssociation", "video_id", "playlist_id")
+ViewerSubscribeYoutuber = _entity_cls("ViewerSubscribeYoutuber", "viewer_id", "youtuber_id")
+ViewerSubscribeChannel = _entity_cls("ViewerSubscribeChannel", "viewer_id", "channel_id")
+
+
+@dataclasses.dataclass
+class ItemType:
+    """
+    Metadata about one kind of item in the table.
+
+    :param name: the value stored in the ``type`` attribute, also encoded
+        into relationship pk / sk.
+    :param type: one of :class:`TypeEnum`.
+    :param klass: the :class:`Entity` subclass for this kind of item.
+    :param shard_count: number of write shards for the relationship
+        partition. A single DynamoDB partition caps at 1000 WCU / 3000 RCU
+        no matter the table capacity, so relationship types where one
+        entity can get hot (a viral youtuber's subscriber list) should
+        spread their rows over several ``pk#{shard}`` partitions.
+    """
+
+    name: str
+    type: str
+    klass: T.Type[Entity]
+    shard_count: int = 1
+
+    def __post_init__(self):
+        # precompute the "_{name}" pk / sk suffix once, so hot methods do a
+        # single str concat instead of re-formatting an f-string per call
+        self._suffix = "_" + self.name
+        # many-to-many sort keys are "{TYPE}#{right_id}" — the type lives
+        # on one key axis only, saving 2 * len("_{TYPE}") bytes per row on
+        # the wire and in storage versus suffixing both keys
+        self._sk_prefix = self.name + "#"
+        # the (klass, index-or-not, key-format) triple is fixed per type and
+        # direction, so bind it into two specialized closures up front —
+        # the finders then dispatch with a single call, no branching.
+        # both project the keys explicitly (Select=SPECIFIC_ATTRIBUTES), so
+        # an index query can never silently expand into base-table fetches
+        # for an unprojected attribute
+        if self.type is TypeEnum.m2m:
+            self._query_left = (
+                lambda entity_id, _klass=self.klass, _p=self._sk_prefix: _klass.query(
+                    hash_key=entity_id,
+                    range_key_condition=_klass.sk.startswith(_p),
+                    attributes_to_get=["pk", "sk", "right_name"],
+                )
+            )
+            self._query_right = (
+                lambda entity_id, _klass=self.klass, _p=self._sk_prefix: _klass.lookup_index.query(
+                    hash_key=_p + entity_id,
+                    attributes_to_get=["pk", "sk"],
+                )
+            )
+        else:
+            self._query_left = (
+                lambda entity_id, _klass=self.klass, _s=self._suffix: _klass.query(
+                    hash_key=entity_id + _s,
+                    attributes_to_get=["pk", "sk"],
+                )
+            )
+            self._query_right = (
+                lambda entity_id, _klass=self.klass, _s=self._suffix: _klass.lookup_index.query(
+                    hash_key=entity_id + _s,
+                    attributes_to_get=["pk", "sk"],
+                )
+            )
+
+
+user_type = ItemType(name="USER", type=TypeEnum.entity, klass=User)
+video_type = ItemType(name="VIDEO", type=TypeEnum.entity, klass=Video)
+channel_type = ItemType(name="CHANNEL", type=TypeEnum.entity, klass=Channel)
+playlist_type = ItemType(name="PLAYLIST", type=TypeEnum.entity, klass=Playlist)
+video_ownership_type = ItemType(
+    name="VIDEO-OWNERSHIP", type=TypeEnum.o2m, klass=VideoOwnership
+)
+channel_ownership_type = ItemType(
+    name="CHANNEL-OWNERSHIP", type=TypeEnum.o2m, klass=ChannelOwnership
+)
+playlist_ownership_type = ItemType(
+    name="PLAYLIST-OWNERSHIP", type=TypeEnum.o2m, klass=PlaylistOwnership
+)
+video_channel_association_type = ItemType(
+    name="VIDEO-CHANNEL-ASSOCIATION",
+    type=TypeEnum.m2m,
+    klass=VideoChannelAssociation,
+)
+video_playlist_association_type = ItemType(
+    name="VIDEO-PLAYLIST-ASSOCIATION",
+    type=TypeEnum.m2m,
+    klass=VideoPlaylistAssociation,
+)
+viewer_subscribe_youtuber_type = ItemType(
+    name="VIEWER-SUBSCRIBE-YOUTUBER",
+    type=TypeEnum.m2m,
+    klass=ViewerSubscribeYoutuber,
+    shard_count=16,
+)
+viewer_subscribe_channel_type = ItemType(
+    name="VIEWER-SUBSCRIBE-CHANNEL",
+    type=TypeEnum.m2m,
+    klass=ViewerSubscribeChannel,
+)
+
+item_type_list = [
+    user_type,
+    video_type,
+    channel_type,
+    playlist_type,
+    video_ownership_type,
+    channel_ownership_type,
+    playlist_ownership_type,
+    video_channel_association_type,
+    video_playlist_association_type,
+    viewer_subscribe_youtuber_type,
+    viewer_subscribe_channel_type,
+]
+
+
+@dataclasses.dataclass
+class BusinessOperation:
+    """
+    Implement all "User Interaction" and "Query Pattern" as methods.
+    """
+
+    item_type_list: T.List[ItemType] = dataclasses.field(
+        default_factory=lambda: list(item_type_list)
+    )
+    max_read_workers: int = 10
+    cache_maxsize: int = 4096
+
+    @cached_property
+    def _client(self):
+        """
+        The raw botocore DynamoDB client, for hot paths that skip the
+        pynamodb attribute-descriptor machinery entirely.
+        """
+        return connect.client
+
+    def __post_init__(self):
+        # the set of item types is closed at construction, so bind each one
+        # as a direct attribute (op.user, op.video_ownership, ...) — one
+        # attribute read instead of a string hash + dict lookup per call
+        for item_type in self.item_type_list:
+            setattr(self, item_type.name.lower().replace("-", "_"), item_type)
+        # read-aside cache for the relationship finders: repeated reads of
+        # the same (type, entity, direction) triple cost a dict lookup
+        # instead of a DynamoDB query; writes invalidate their own keys
+        self._read_cache: T.Dict[tuple, list] = {}
+
+    def _cache_put(self, key: tuple, entities: list):
+        cache = self._read_cache
+        if len(cache) >= self.cache_maxsize:
+            # insertion-ordered dict: drop the oldest entry
+            cache.pop(next(iter(cache)))
+        cache[key] = entities
+
+    def _invalidate(self, *keys: tuple):
+        for key in keys:
+            self._read_cache.pop(key, None)
+
+    # --------------------------------------------------------------------------
+    # Create entity
+    # --------------------------------------------------------------------------
+    def new_entity(self, type: ItemType, id: str, name: str) -> Entity:
+        """
+        Implement "User Interaction": create a new entity, fail if the id
+        is already taken.
+        """
+        klass = type.klass
+        entity = klass(pk=id, sk=ROOT, type=type.name, name=name)
+        entity.save(condition=~klass.pk.exists())
+        return entity
+
+    def batch_new_entities(
+        self,
+        specs: T.List[T.Tuple[ItemType, str, str]],
+    ) -> T.List[Entity]:
+        """
+        Implement "User Interaction": bulk-create many entities in one shot.
+
+        Buffer the items and flush them via ``Entity.batch_write()``
+        (``BatchWriteItem`` under the hood, auto-chunked at 25 items,
+        unprocessed items are re-queued automatically). BatchWriteItem does
+        not support condition expression, so unlike :meth:`new_entity` this
+        method silently overwrites existing items — only use it for bulk load.
+
+        :param specs: list of ``(item_type, id, name)`` tuples.
+        """
+        entities = list()
+        with Entity.batch_write() as batch:
+            for type, id, name in specs:
+                entity = type.klass(pk=id, sk=ROOT, type=type.name, name=name)
+                batch.save(entity)
+                entities.append(entity)
+        return entities
+
+    def create_entity_with_owner(
+        self,
+        entity_type: ItemType,
+        owner_type: ItemType,
+        id: str,
+        name: str,
+        owner_id: str,
+    ) -> Entity:
+        """
+        Implement "User Interaction": create a new entity and assign its owner
+        in a single TransactWriteItems call, instead of one PutItem round-trip
+        for the entity plus another transaction for the ownership.
+
+        A freshly created entity cannot have a prior owner, so the ownership
+        row is written unconditionally, like :meth:`set_one_to_many_initial`.
+        """
+        klass = entity_type.klass
+        entity = klass(pk=id, sk=ROOT, type=entity_type.name, name=name)
+        with pm.TransactWrite(connection=connect) as trans:
+            trans.save(entity, condition=~klass.pk.exists())
+            trans.save(
+                owner_type.klass(
+                    pk=id + owner_type._suffix,
+                    sk=owner_id + owner_type._suffix,
+                    type=owner_type.name,
+                )
+            )
+        self._invalidate((owner_type.name, owner_id, False))
+        return entity
+
+    def new_user(self, id: str, name: str) -> User:
+        return self.new_entity(user_type, id, name)
+
+    def new_video(self, id: str, name: str) -> Video:
+        return self.new_entity(video_type, id, name)
+
+    def new_channel(self, id: str, name: str) -> Channel:
+        return self.new_entity(channel_type, id, name)
+
+    def new_playlist(self, id: str, name: str) -> Playlist:
+        return self.new_entity(playlist_type, id, name)
+
+    # --------------------------------------------------------------------------
+    # One-to-many relationship
+    # --------------------------------------------------------------------------
+    def set_one_to_many_initial(
+        self,
+        type: ItemType,
+        many_entity_id: str,
+        one_entity_id: str,
+    ):
+        """
+        Implement "User Interaction": assign the "one" side entity of a
+        one-to-many relationship for a freshly created many-entity,
+        e.g. set the owner of a just-uploaded video.
+
+        A new entity cannot have prior ownership, so this is a single
+        conditional PutItem — no query, no delete, one round-trip.
+        """
+        klass = type.klass
+        klass(
+            pk=many_entity_id + type._suffix,
+            sk=one_entity_id + type._suffix,
+            type=type.name,
+        ).save(condition=~klass.pk.exists())
+        self._invalidate((type.name, one_entity_id, False))
+
+    def change_one_to_many(
+        self,
+        type: ItemType,
+        many_entity_id: str,
+        old_one_entity_id: str,
+        new_one_entity_id: str,
+    ):
+        """
+        Implement "User Interaction": move the "one" side of an existing
+        one-to-many relationship from a known old entity to a new one,
+        e.g. transfer a video to another user.
+
+        The caller knows the current owner, so no query is needed — and a
+        TransactWriteItems wrapper isn't either: transactional writes bill
+        2x the WCU of a plain write and carry the 100-item / 4 MB
+        transaction quotas. Two plain single-item writes reach the same
+        end state at 1x WCU each. The trade-off is a brief window where
+        the old and new owner rows coexist; this workload tolerates the
+        eventually-consistent invariant, wrap the two calls back into
+        ``pm.TransactWrite`` if strict atomicity is ever required.
+        """
+        if old_one_entity_id == new_one_entity_id:
+            return
+        klass = type.klass
+        pk = many_entity_id + type._suffix
+        klass(
+            pk=pk,
+            sk=new_one_entity_id + type._suffix,
+            type=type.name,
+        ).save()
+        klass(
+            pk=pk,
+            sk=old_one_entity_id + type._suffix,
+        ).delete()
+        self._invalidate(
+            (type.name, old_one_entity_id, False),
+            (type.name, new_one_entity_id, False),
+        )
+
+    def reset_one_to_many(
+        self,
+        type: ItemType,
+        many_entity_id: str,
+        one_entity_id: str,
+    ):
+        """
+        Implement "User Interaction": point the "one" side of a
+        one-to-many relationship at ``one_entity_id`` when the caller does
+        not know the current value, e.g. reassign a video whose owner was
+        never looked up.
+
+        The existing rows are discovered with a keys-only query on the
+        relationship partition (``attributes_to_get=["pk", "sk"]``, so no
+        payload attributes cross the wire), swept away with BatchWriteItem
+        deletes, and the new row is written with one plain PutItem — all
+        at 1x WCU, where wrapping the whole swap in TransactWriteItems
+        would bill 2x per item and cap the batch at 100 items.
+        """
+        klass = type.klass
+        pk = many_entity_id + type._suffix
+        new_sk = one_entity_id + type._suffix
+        old_rows = [
+            row
+            for row in klass.query(hash_key=pk, attributes_to_get=["pk", "sk"])
+            if row.sk != new_sk
+        ]
+        if old_rows:
+            with klass.batch_write() as batch:
+                for row in old_rows:
+                    batch.delete(row)
+        klass(pk=pk, sk=new_sk, type=type.name).save()
+        self._invalidate(
+            (type.name, one_entity_id, False),
+            *((type.name, row.sk_id, False) for row in old_rows),
+        )
+
+    def set_video_owner(self, video_id: str, user_id: str):
+        self.set_one_to_many_initial(video_ownership_type, video_id, user_id)
+
+    def set_channel_owner(self, channel_id: str, user_id: str):
+        self.set_one_to_many_initial(channel_ownership_type, channel_id, user_id)
+
+    def set_playlist_owner(self, playlist_id: str, user_id: str):
+        self.set_one_to_many_initial(playlist_ownership_type, playlist_id, user_id)
+
+    def change_video_owner(self, video_id: str, old_user_id: str, new_user_id: str):
+        self.change_one_to_many(video_ownership_type, video_id, old_user_id, new_user_id)
+
+    def reset_video_owner(self, video_id: str, user_id: str):
+        self.reset_one_to_many(video_ownership_type, video_id, user_id)
+
+    # --------------------------------------------------------------------------
+    # Many-to-many relationship
+    # --------------------------------------------------------------------------
+    def set_many_to_many(
+        self,
+        type: ItemType,
+        left_entity_id: str,
+        right_entity_id: str,
+        return_old_values: bool = False,
+        batch=None,
+        left_name: T.Optional[str] = None,
+        right_name: T.Optional[str] = None,
+    ) -> T.Optional[bool]:
+        """
+        Implement "User Interaction": link two entities in a many-to-many
+        relationship, e.g. add a video to a channel.
+
+        The pk / sk is fully determined by ``(left, right, type)`` and the
+        row carries no mutable state, so an unconditional PutItem is
+        semantically the same as "insert if not exists" — linking the same
+        pair twice just overwrites the same row. Dropping the condition
+        halves the WCU (conditional writes bill the read too) and keeps
+        the operation batchable (BatchWriteItem forbids conditions).
+
+        For sharded types the row lands in one of ``shard_count``
+        partitions, picked by a stable hash of the right entity id.
+
+        :param return_old_values: if True, use ``ReturnValues=ALL_OLD`` and
+            return whether the association already existed — still one WCU
+            cheaper than a full conditional check.
+
+        The write goes through the raw botocore client: an association row
+        is three fixed strings, so the pynamodb per-item descriptor walk
+        and dict copies buy nothing here.
+
+        :param batch: an open ``Entity.batch_write()`` context; when given,
+            the row is appended to it (BatchWriteItem, 25 rows per
+            round-trip) instead of being sent as its own PutItem —
+            mutually exclusive with ``return_old_values`` (raises
+            ``ValueError`` if both are passed). Note the cache keys are
+            invalidated when the row is queued on the batch, not when the
+            batch flushes, so don't read between queueing and flushing.
+        :param left_name, right_name: display names to denormalize onto
+            the row, so a single relationship query returns
+            rendering-ready data instead of N follow-up GetItems. When a
+            name changes, re-link the stale rows (enumerate them via the
+            finders) — the accepted trade-off of partial normalization.
+        """
+        if batch is not None and return_old_values:
+            raise ValueError(
+                "return_old_values is not available with batch: "
+                "BatchWriteItem cannot return the replaced item"
+            )
+        pk = left_entity_id
+        if type.shard_count > 1:
+            shard = crc32(right_entity_id.encode("utf-8")) % type.shard_count
+            pk = f"{pk}#{shard}"
+        if batch is not None:
+            batch.save(
+                type.klass(
+                    pk=pk,
+                    sk=type._sk_prefix + right_entity_id,
+                    type=type.name,
+                    left_name=left_name,
+                    right_name=right_name,
+                )
+            )
+            self._invalidate(
+                (type.name, left_entity_id, True),
+                (type.name, right_entity_id, False),
+            )
+            return None
+        item = {
+            "pk": {"S": pk},
+            "sk": {"S": type._sk_prefix + right_entity_id},
+            "type": {"S": type.name},
+        }
+        if left_name is not None:
+            item["left_name"] = {"S": left_name}
+        if right_name is not None:
+            item["right_name"] = {"S": right_name}
+        if return_old_values:
+            res = self._client.put_item(
+                TableName=Entity.Meta.table_name,
+                Item=item,
+                ReturnValues="ALL_OLD",
+            )
+            self._invalidate(
+                (type.name, left_entity_id, True),
+                (type.name, right_entity_id, False),
+            )
+            return "Attributes" in res
+        self._client.put_item(TableName=Entity.Meta.table_name, Item=item)
+        self._invalidate(
+            (type.name, left_entity_id, True),
+            (type.name, right_entity_id, False),
+        )
+        return None
+
+    def add_video_to_channel(self, video_id: str, channel_id: str, batch=None, **names):
+        self.set_many_to_many(
+            video_channel_association_type, video_id, channel_id, batch=batch, **names
+        )
+
+    def add_video_to_playlist(self, video_id: str, playlist_id: str, batch=None, **names):
+        self.set_many_to_many(
+            video_playlist_association_type, video_id, playlist_id, batch=batch, **names
+        )
+
+    def subscribe_youtuber(self, viewer_id: str, youtuber_id: str, batch=None, **names):
+        self.set_many_to_many(
+            viewer_subscribe_youtuber_type, viewer_id, youtuber_id, batch=batch, **names
+        )
+
+    def subscribe_channel(self, viewer_id: str, channel_id: str, batch=None, **names):
+        self.set_many_to_many(
+            viewer_subscribe_channel_type, viewer_id, channel_id, batch=batch, **names
+        )
+
+    # --------------------------------------------------------------------------
+    # Query patterns
+    # --------------------------------------------------------------------------
+    def find_many_by_one(
+        self,
+        type: ItemType,
+        one_entity_id: str,
+    ) -> T.Iterator[T_Entity]:
+        """
+        Implement "Query Pattern": find all "many" side entities of a
+        one-to-many relationship, e.g. find all videos owned by a user.
+
+        The full result is materialized into the read-aside cache before
+        anything is returned — the iterator you get back walks that
+        cached list, so the first item arrives only after DynamoDB
+        finishes paginating. A repeat of the same lookup costs a dict hit
+        instead of a query; the ownership writers invalidate their keys.
+
+        Since ``LookupIndex`` is KEYS_ONLY, the returned items carry only
+        pk / sk; callers that need full entity attributes have to do a
+        follow-up get on the base table.
+        """
+        key = (type.name, one_entity_id, False)
+        cached = self._read_cache.get(key)
+        if cached is None:
+            cached = list(type._query_right(one_entity_id))
+            self._cache_put(key, cached)
+        return iter(cached)
+
+    def find_many_by_many(
+        self,
+        type: ItemType,
+        entity_id: str,
+        lookup_by_left: bool = True,
+    ) -> T.Iterator[T_Entity]:
+        """
+        Implement "Query Pattern": find all linked entities of a many-to-many
+        relationship, from either side.
+
+        Like :meth:`find_many_by_one`, the result is fully materialized
+        into the read-aside cache first and the returned iterator walks
+        the cached list.
+
+        :param lookup_by_left: if True, ``entity_id`` is the "left" side and
+            we look up the "right" side, otherwise the other way around.
+        """
+        key = (type.name, entity_id, lookup_by_left)
+        cached = self._read_cache.get(key)
+        if cached is None:
+            if lookup_by_left:
+                if type.shard_count > 1:
+                    cached = list(self._scatter_query(type, entity_id))
+                else:
+                    cached = list(type._query_left(entity_id))
+            else:
+                cached = list(type._query_right(entity_id))
+            self._cache_put(key, cached)
+        return iter(cached)
+
+    def find_many_by_many_raw(
+        self,
+        type: ItemType,
+        entity_id: str,
+    ) -> T.Iterator[dict]:
+        """
+        Hot-path variant of :meth:`find_many_by_many` (left side, unsharded
+        types only): pages through the raw botocore client and yields
+        DynamoDB-JSON rows like ``{"pk": {"S": ...}, ...}`` without ORM
+        hydration. Use the ORM finder when the caller actually manipulates
+        the items.
+        """
+        kwargs = dict(
+            TableName=Entity.Meta.table_name,
+            KeyConditionExpression="pk = :pk AND begins_with(sk, :prefix)",
+            ExpressionAttributeValues={
+                ":pk": {"S": entity_id},
+                ":prefix": {"S": type._sk_prefix},
+            },
+        )
+        while True:
+            res = self._client.query(**kwargs)
+            yield from res["Items"]
+            last_evaluated_key = res.get("LastEvaluatedKey")
+            if not last_evaluated_key:
+                break
+            kwargs["ExclusiveStartKey"] = last_evaluated_key
+
+    def find_videos_owned_by_user(self, user_id: str) -> T.Iterator[VideoOwnership]:
+        return self.find_many_by_one(video_ownership_type, user_id)
+
+    def find_channels_owned_by_user(self, user_id: str) -> T.Iterator[ChannelOwnership]:
+        return self.find_many_by_one(channel_ownership_type, user_id)
+
+    def find_playlists_owned_by_user(self, user_id: str) -> T.Iterator[PlaylistOwnership]:
+        return self.find_many_by_one(playlist_ownership_type, user_id)
+
+    def find_channels_that_have_video(
+        self, video_id: str
+    ) -> T.Iterator[VideoChannelAssociation]:
+        return self.find_many_by_many(
+            video_channel_association_type, video_id, lookup_by_left=True
+        )
+
+    def find_videos_in_channel(
+        self, channel_id: str
+    ) -> T.Iterator[VideoChannelAssociation]:
+        return self.find_many_by_many(
+            video_channel_association_type, channel_id, lookup_by_left=False
+        )
+
+    def find_playlists_that_have_video(
+        self, video_id: str
+    ) -> T.Iterator[VideoPlaylistAssociation]:
+        return self.find_many_by_many(
+            video_playlist_association_type, video_id, lookup_by_left=True
+        )
+
+    def find_videos_in_playlist(
+        self, playlist_id: str
+    ) -> T.Iterator[VideoPlaylistAssociation]:
+        return self.find_many_by_many(
+            video_playlist_association_type, playlist_id, lookup_by_left=False
+        )
+
+    def find_subscribed_youtubers(
+        self, viewer_id: str
+    ) -> T.Iterator[ViewerSubscribeYoutuber]:
+        return self.find_many_by_many(
+            viewer_subscribe_youtuber_type, viewer_id, lookup_by_left=True
+        )
+
+    def find_subscribers_for_youtuber(
+        self, youtuber_id: str
+    ) -> T.Iterator[ViewerSubscribeYoutuber]:
+        return self.find_many_by_many(
+            viewer_subscribe_youtuber_type, youtuber_id, lookup_by_left=False
+        )
+
+    def find_subscribed_channels(
+        self, viewer_id: str
+    ) -> T.Iterator[ViewerSubscribeChannel]:
+        return self.find_many_by_many(
+            viewer_subscribe_channel_type, viewer_id, lookup_by_left=True
+        )
+
+    def find_subscribers_for_channel(
+        self, channel_id: str
+    ) -> T.Iterator[ViewerSubscribeChannel]:
+        return self.find_many_by_many(
+            viewer_subscribe_channel_type, channel_id, lookup_by_left=False
+        )
+
+    def batch_get_entities(
+        self,
+        klass: T.Type[T_Entity],
+        ids: T.List[str],
+    ) -> T.List[T_Entity]:
+        """
+        Implement "Query Pattern": resolve many entity ids into full entity
+        items in one shot.
+
+        The lookup index only returns keys, so hydrating N query results
+        naively costs N sequential GetItem round-trips (the classic N+1
+        pattern). BatchGetItem takes up to 100 keys per call, collapsing
+        that into ceil(N / 100) round-trips; pynamodb retries unprocessed
+        keys with exponential backoff for us. We don't need atomicity
+        across the keys, so BatchGetItem beats TransactGetItems here.
+
+        Multiple 100-key chunks are dispatched concurrently on a thread
+        pool (``max_read_workers`` wide), so a large fan-out costs ~1
+        round-trip of wall time instead of one round-trip per chunk.
+        """
+        keys_chunks = [
+            [(id, ROOT) for id in ids[i : i + 100]]
+            for i in range(0, len(ids), 100)
+        ]
+        if len(keys_chunks) <= 1:
+            return [
+                entity for keys in keys_chunks for entity in klass.batch_get(keys)
+            ]
+        with ThreadPoolExecutor(max_workers=self.max_read_workers) as executor:
+            futures = [
+                executor.submit(self._batch_get_chunk, klass, keys)
+                for keys in keys_chunks
+            ]
+            return list(
+                itertools.chain.from_iterable(
+                    future.result() for future in as_completed(futures)
+                )
+            )
+
+    def _scatter_query(
+        self,
+        type: ItemType,
+        entity_id: str,
+    ) -> T.Iterator[T_Entity]:
+        """
+        Fan one logical partition read out over its write shards, one query
+        per ``pk#{shard}`` partition, executed in parallel.
+        """
+        with ThreadPoolExecutor(
+            max_workers=min(type.shard_count, self.max_read_workers)
+        ) as executor:
+            futures = [
+                executor.submit(self._query_shard, type, f"{entity_id}#{shard}")
+                for shard in range(type.shard_count)
+            ]
+            entities = list(
+                itertools.chain.from_iterable(
+                    future.result() for future in as_completed(futures)
+                )
+            )
+        return iter(entities)
+
+    @staticmethod
+    def _query_shard(
+        type: ItemType,
+        pk: str,
+    ) -> T.List[T_Entity]:
+        klass = type.klass
+        return list(
+            klass.query(
+                hash_key=pk,
+                range_key_condition=klass.sk.startswith(type._sk_prefix),
+                attributes_to_get=["pk", "sk", "right_name"],
+            )
+        )
+
+    @staticmethod
+    def _batch_get_chunk(
+        klass: T.Type[T_Entity],
+        keys: T.List[T.Tuple[str, str]],
+    ) -> T.List[T_Entity]:
+        return list(klass.batch_get(keys))
+
+    def get_videos_in_channel_hydrated(self, channel_id: str) -> T.List[Video]:
+        """
+        Like :meth:`find_videos_in_channel`, but returns the full ``Video``
+        entities instead of the key-only association items.
+        """
+        associations = self.find_videos_in_channel(channel_id)
+        return self.batch_get_entities(
+            Video, [association.pk_id for association in associations]
+        )
+
+    def list_entities(self, type: ItemType) -> T.List[T_Entity]:
+        """
+        Implement "Query Pattern": list all entities of a given type
+        (entity types only — relationship rows don't live under ``ROOT``).
+
+        A Query on the type GSI reads O(matches) instead of a Scan's
+        O(table size); the key-only index rows are then hydrated with one
+        BatchGetItem pass.
+        """
+        klass = type.klass
+        ids = [item.pk for item in klass.type_index.query(hash_key=type.name)]
+        return self.batch_get_entities(klass, ids)
+
+    def list_users(self) -> T.List[User]:
+        return self.list_entities(user_type)
+
+    def list_videos(self) -> T.List[Video]:
+        return self.list_entities(video_type)
+
+    def list_channels(self) -> T.List[Channel]:
+        return self.list_entities(channel_type)
+
+    def list_playlists(self) -> T.List[Playlist]:
+        return self.list_entities(playlist_type)
+
+    def scan(self, total_segments: int = 4) -> T.Iterator[Entity]:
+        """
+        Full-table dump for debugging / demo output.
+
+        A plain Scan walks the partitions one after another on a single
+        thread; splitting it into ``total_segments`` server-side segments
+        and running one worker per segment divides the wall-clock time by
+        the segment count (the billed RCU stays the same — this is a
+        latency optimization, not a cost one).
+        """
+        if total_segments <= 1:
+            return Entity.scan()
+        with ThreadPoolExecutor(
+            max_workers=min(total_segments, self.max_read_workers)
+        ) as executor:
+            futures = [
+                executor.submit(self._scan_segment, segment, total_segments)
+                for segment in range(total_segments)
+            ]
+            entities = list(
+                itertools.chain.from_iterable(
+                    future.result() for future in as_completed(futures)
+                )
+            )
+        return iter(entities)
+
+    @staticmethod
+    def _scan_segment(segment: int, total_segments: int) -> T.List[Entity]:
+        return list(Entity.scan(segment=segment, total_segments=total_segments))
+
+
+@dataclasses.dataclass
+class MemoryOperation(BusinessOperation):
+    """
+    A drop-in :class:`BusinessOperation` for test runs: every relationship
+    write is mirrored into plain dicts keyed the same way as the read
+    cache, and the relationship finders answer from those dicts without
+    touching the store at all — no moto JSON round-trip, just a dict hit.
+
+    The mirror is only complete if this instance observes every write, so
+    construct it against an empty table (the demo calls ``delete_all``
+    first). Set ``USE_INPROC=1`` to run the demo through it.
+    """
+
+    def __post_init__(self):
+        super().__post_init__()
+        # {(type.name, entity_id, lookup_by_left): {(pk, sk): row}}
+        self._local_index: T.Dict[tuple, T.Dict[tuple, Entity]] = {}
+
+    def _mirror(self, type: ItemType, pk: str, sk: str, *keys: tuple):
+        row = type.klass(pk=pk, sk=sk, type=type.name)
+        for key in keys:
+            self._local_index.setdefault(key, {})[(pk, sk)] = row
+
+    def create_entity_with_owner(self, entity_type, owner_type, id, name, owner_id):
+        entity = super().create_entity_with_owner(
+            entity_type, owner_type, id, name, owner_id
+        )
+        self._mirror(
+            owner_type,
+            id + owner_type._suffix,
+            owner_id + owner_type._suffix,
+            (owner_type.name, owner_id, False),
+        )
+        return entity
+
+    def set_one_to_many_initial(self, type, many_entity_id, one_entity_id):
+        super().set_one_to_many_initial(type, many_entity_id, one_entity_id)
+        self._mirror(
+            type,
+            many_entity_id + type._suffix,
+            one_entity_id + type._suffix,
+            (type.name, one_entity_id, False),
+        )
+
+    def change_one_to_many(
+        self, type, many_entity_id, old_one_entity_id, new_one_entity_id
+    ):
+        super().change_one_to_many(
+            type, many_entity_id, old_one_entity_id, new_one_entity_id
+        )
+        if old_one_entity_id == new_one_entity_id:
+            return
+        pk = many_entity_id + type._suffix
+        bucket = self._local_index.get((type.name, old_one_entity_id, False), {})
+        bucket.pop((pk, old_one_entity_id + type._suffix), None)
+        self._mirror(
+            type,
+            pk,
+            new_one_entity_id + type._suffix,
+            (type.name, new_one_entity_id, False),
+        )
+
+    def reset_one_to_many(self, type, many_entity_id, one_entity_id):
+        super().reset_one_to_many(type, many_entity_id, one_entity_id)
+        # the old "one" side is unknown here by design, so sweep the pk
+        # out of every bucket of this relationship type
+        pk = many_entity_id + type._suffix
+        for key, bucket in self._local_index.items():
+            if key[0] == type.name:
+                for row_key in [k for k in bucket if k[0] == pk]:
+                    bucket.pop(row_key)
+        self._mirror(
+            type,
+            pk,
+            one_entity_id + type._suffix,
+            (type.name, one_entity_id, False),
+        )
+
+    def set_many_to_many(
+        self,
+        type,
+        left_entity_id,
+        right_entity_id,
+        return_old_values=False,
+        batch=None,
+        left_name=None,
+        right_name=None,
+    ):
+        res = super().set_many_to_many(
+            type,
+            left_entity_id,
+            right_entity_id,
+            return_old_values=return_old_values,
+            batch=batch,
+            left_name=left_name,
+            right_name=right_name,
+        )
+        pk = left_entity_id
+        if type.shard_count > 1:
+            shard = crc32(right_entity_id.encode("utf-8")) % type.shard_count
+            pk = f"{pk}#{shard}"
+        row = type.klass(
+            pk=pk,
+            sk=type._sk_prefix + right_entity_id,
+            type=type.name,
+            left_name=left_name,
+            right_name=right_name,
+        )
+        for key in (
+            (type.name, left_entity_id, True),
+            (type.name, right_entity_id, False),
+        ):
+            self._local_index.setdefault(key, {})[(pk, row.sk)] = row
+        return res
+
+    def find_many_by_one(self, type, one_entity_id):
+        bucket = self._local_index.get((type.name, one_entity_id, False), {})
+        return iter(list(bucket.values()))
+
+    def find_many_by_many(self, type, entity_id, lookup_by_left=True):
+        bucket = self._local_index.get((type.name, entity_id, lookup_by_left), {})
+        return iter(list(bucket.values()))
+
+
+def print_all(lst: T.Iterable[Entity]):
+    for entity in lst:
+        entity.print()
+
+
+def assert_pk(lst: T.Iterable[Entity], pk_ids: T.List[str]):
+    assert set(entity.pk_id for entity in lst) == set(pk_ids)
+
+
+def assert_sk(lst: T.Iterable[Entity], sk_ids: T.List[str]):
+    assert set(entity.sk_id for entity in lst) == set(sk_ids)
+
+
+def print_and_assert_pk(lst: T.Iterable[Entity], pk_ids: T.List[str]):
+    """
+    Print and verify in one pass, so single-pass iterators from the finders
+    can be consumed directly without materializing a list first.
+    """
+    seen = set()
+    for entity in lst:
+        entity.print()
+        seen.add(entity.pk_id)
+    assert seen == set(pk_ids)
+
+
+def print_and_assert_sk(lst: T.Iterable[Entity], sk_ids: T.List[str]):
+    seen = set()
+    for entity in lst:
+        entity.print()
+        seen.add(entity.sk_id)
+    assert seen == set(sk_ids)
+
+
+# ------------------------------------------------------------------------------
+# Setup Dummy Data
+# ------------------------------------------------------------------------------
+# Create DynamoDB table and index if not exists
+Entity.create_table(wait=True)
+
+# Clean up existing dummy data before testing
+Entity.delete_all()
+
+# USE_INPROC=1 swaps in the dict-backed finders for much faster test runs
+if os.environ.get("USE_INPROC", "0") == "1":
+    op = MemoryOperation()
+else:
+    op = BusinessOperation()
+
+print("--- create entities ---")
+# bulk-create all entities in one BatchWriteItem call, instead of one
+# conditional PutItem round-trip per entity
+op.batch_new_entities(
+    [
+        (user_type, "u-1", "Alice"),
+        (user_type, "u-2", "Bob"),
+        (user_type, "u-3", "Cathy"),
+    ]
+)
+
+print("--- create owned entities ---")
+# one TransactWriteItems call creates the entity and its ownership together,
+# instead of one PutItem plus one TransactWrite per entity
+op.create_entity_with_owner(video_type, video_ownership_type, "v-1-1", "Alice's video 1", "u-1")
+op.create_entity_with_owner(video_type, video_ownership_type, "v-1-2", "Alice's video 2", "u-1")
+op.create_entity_with_owner(video_type, video_ownership_type, "v-2-1", "Bob's video 1", "u-2")
+op.create_entity_with_owner(video_type, video_ownership_type, "v-2-2", "Bob's video 2", "u-2")
+op.create_entity_with_owner(channel_type, channel_ownership_type, "c-1-1", "Alice's channel 1", "u-1")
+op.create_entity_with_owner(channel_type, channel_ownership_type, "c-1-2", "Alice's channel 2", "u-1")
+op.create_entity_with_owner(channel_type, channel_ownership_type, "c-2-1", "Bob's channel 1", "u-2")
+op.create_entity_with_owner(playlist_type, playlist_ownership_type, "p-1-1", "Alice's playlist 1", "u-1")
+op.create_entity_with_owner(playlist_type, playlist_ownership_type, "p-1-2", "Alice's playlist 2", "u-1")
+
+print("--- set associations ---")
+# all twelve association rows ride in one BatchWriteItem round-trip
+with Entity.batch_write() as batch:
+    op.add_video_to_channel("v-1-1", "c-1-1", batch=batch)
+    op.add_video_to_channel("v-1-2", "c-1-1", batch=batch)
+    op.add_video_to_channel("v-1-2", "c-1-2", batch=batch)
+    op.add_video_to_playlist("v-1-1", "p-1-1", batch=batch)
+    op.add_video_to_playlist("v-1-2", "p-1-1", batch=batch)
+    op.add_video_to_playlist("v-1-2", "p-1-2", batch=batch)
+    op.subscribe_youtuber("u-2", "u-1", batch=batch, right_name="Alice")
+    op.subscribe_youtuber("u-3", "u-1", batch=batch, right_name="Alice")
+    op.subscribe_youtuber("u-3", "u-2", batch=batch, right_name="Bob")
+    op.subscribe_channel("u-2", "c-1-1", batch=batch)
+    op.subscribe_channel("u-3", "c-1-1", batch=batch)
+    op.subscribe_channel("u-3", "c-2-1", batch=batch)
+
+# ------------------------------------------------------------------------------
+# Test Query Patterns
+# ------------------------------------------------------------------------------
+print("--- all users ---")
+print_and_assert_pk(op.list_users(), ["u-1", "u-2", "u-3"])
+
+print("--- videos owned by u-1 ---")
+print_and_assert_pk(op.find_videos_owned_by_user("u-1"), ["v-1-1", "v-1-2"])
+
+print("--- channels owned by u-2 ---")
+print_and_assert_pk(op.find_channels_owned_by_user("u-2"), ["c-2-1"])
+
+print("--- playlists owned by u-1 ---")
+print_and_assert_pk(op.find_playlists_owned_by_user("u-1"), ["p-1-1", "p-1-2"])
+
+print("--- videos in channel c-1-1 ---")
+print_and_assert_pk(op.find_videos_in_channel("c-1-1"), ["v-1-1", "v-1-2"])
+
+print("--- videos in channel c-1-1, hydrated ---")
+res = op.get_videos_in_channel_hydrated("c-1-1")
+print_all(res)
+assert_pk(res, ["v-1-1", "v-1-2"])
+
+print("--- channels that have video v-1-2 ---")
+print_and_assert_sk(op.find_channels_that_have_video("v-1-2"), ["c-1-1", "c-1-2"])
+
+print("--- videos in playlist p-1-1 ---")
+print_and_assert_pk(op.find_videos_in_playlist("p-1-1"), ["v-1-1", "v-1-2"])
+
+print("--- youtubers subscribed by u-3 ---")
+print_and_assert_sk(op.find_subscribed_youtubers("u-3"), ["u-1", "u-2"])
+# the denormalized names ride along with the query, no per-row GetItem
+assert {row.right_name for row in op.find_subscribed_youtubers("u-3")} == {
+    "Alice",
+    "Bob",
+}
+
+print("--- subscribers of youtuber u-1 ---")
+print_and_assert_pk(op.find_subscribers_for_youtuber("u-1"), ["u-2", "u-3"])
+
+print("--- channels subscribed by u-3 ---")
+print_and_assert_sk(op.find_subscribed_channels("u-3"), ["c-1-1", "c-2-1"])
+
+print("--- subscribers of channel c-1-1 ---")
+print_and_assert_pk(op.find_subscribers_for_channel("c-1-1"), ["u-2", "u-3"])
+
+print("--- reassign v-2-2 to u-3 without knowing its current owner ---")
+op.reset_video_owner("v-2-2", "u-3")
+assert_pk(op.find_videos_owned_by_user("u-3"), ["v-2-2"])
+op.reset_video_owner("v-2-2", "u-2")
+assert_pk(op.find_videos_owned_by_user("u-2"), ["v-2-1", "v-2-2"])
+
+print("--- everything in the table ---")
+print_all(op.scan())
+
+if USE_MOTO:
+    mock.stop()  # stop mocking DynamoDB
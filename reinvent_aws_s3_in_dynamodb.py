@@ -0,0 +1,580 @@
+# -*- coding: utf-8 -*-
+
+"""
+Reinvent AWS S3 in DynamoDB.
+
+This script is a standalone version of the modeling workflow described in
+``Example.ipynb``. It models a hierarchical file system — directories and
+files, like S3 object keys — in a single DynamoDB table.
+
+Key design:
+
+- ``pk`` is the absolute directory path, always ending with ``/``.
+- ``sk`` is the basename inside that directory; directories keep a
+  trailing ``/``, files don't. The root directory itself is the single
+  item ``pk = "/", sk = ROOT``.
+- listing a directory is then a single Query on its partition.
+"""
+
+import os
+import sys
+import typing as T
+
+import warnings
+import itertools
+import functools
+import dataclasses
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import pynamodb_mate.api as pm
+from pynamodb.exceptions import PutError, TransactWriteError
+# use moto to mock DynamoDB, it is an in-memory implementation of DynamoDB
+# set USE_MOTO=0 to run against real DynamoDB with your default AWS credential
+USE_MOTO = os.environ.get("USE_MOTO", "1") == "1"
+if USE_MOTO:
+    # lazy import: production processes never even load moto
+    from moto import mock_aws
+
+    mock = mock_aws()
+    mock.start()
+
+# create a DynamoDB connection, ensure that your default AWS credential is right
+# if you are using mock, then this line always works
+connect = pm.Connection(
+    region="us-east-1",
+    connect_timeout_seconds=1,
+    read_timeout_seconds=5,
+    max_pool_connections=50,
+)
+
+# indicate that this item only has hash key, range key is not used (logically)
+ROOT = "__root__"
+
+
+@functools.lru_cache(maxsize=2048)
+def split_path(path: str) -> T.Tuple[str, str]:
+    """
+    Split an absolute path into the (pk, sk) pair of the item representing
+    it, e.g. ``/a/b/c.txt`` -> ``("/a/b/", "c.txt")`` and ``/a/b/`` ->
+    ``("/a/", "b/")``.
+
+    Called on every make/exists/list operation, and the same directory
+    paths repeat heavily during a traversal, so results are memoized;
+    the body itself is one ``rfind`` plus two slices — no intermediate
+    list or tuple allocations.
+    """
+    if path == "/":
+        return "/", ROOT
+    # ignore a trailing "/" (directory marker) when locating the cut point
+    cut = len(path) - 1 if path[-1] == "/" else len(path)
+    i = path.rfind("/", 0, cut)
+    return path[: i + 1], path[i + 1 :]
+
+
+@functools.lru_cache(maxsize=4096)
+def join_path(pk: str, sk: str) -> str:
+    """
+    The inverse of :func:`split_path`.
+
+    Memoized like its inverse: dump loops re-join the same hierarchical
+    prefixes over and over, and a cache hit skips the call body entirely.
+    """
+    if sk == ROOT:
+        return pk
+    return pk + sk
+
+
+class ByStatusIndex(pm.GlobalSecondaryIndex):
+    """
+    Serve "documents by status" as a Query instead of a filtered Scan:
+    ``status`` is the hash key and ``updated_at`` the range key, so one
+    partition read returns the matching items in recency order.
+    """
+
+    class Meta:
+        index_name = "by-status-index"
+        projection = pm.KeysOnlyProjection()
+
+    status = pm.UnicodeAttribute(hash_key=True)
+    updated_at = pm.UnicodeAttribute(range_key=True)
+
+
+class Entity(pm.Model):
+    """
+    The main DynamoDB table data model definition. One item per directory
+    or file.
+
+    The table also holds versioned documents as a second item family:
+    ``pk = "doc#<doc_id>"``, ``sk = "v#<version>"`` with the version
+    zero-padded so lexicographic order is numeric order. A document's
+    full history is then one Query on its partition, returned already
+    sorted — never a Scan with a filter.
+    """
+
+    class Meta:
+        table_name = "entity"
+        region = "us-east-1"
+        billing_mode = pm.constants.PAY_PER_REQUEST_BILLING_MODE
+        connect_timeout_seconds = 1
+        read_timeout_seconds = 5
+        max_pool_connections = 50
+
+    pk: pm.REQUIRED_STR = pm.UnicodeAttribute(hash_key=True)
+    sk: pm.REQUIRED_STR = pm.UnicodeAttribute(range_key=True)
+    # document-family attributes; filesystem items leave them unset and
+    # therefore never appear in the sparse status index
+    status: pm.OPTIONAL_STR = pm.UnicodeAttribute(default=None, null=True)
+    updated_at: pm.OPTIONAL_STR = pm.UnicodeAttribute(default=None, null=True)
+
+    by_status_index = ByStatusIndex()
+
+    @classmethod
+    def doc(
+        cls,
+        doc_id: str,
+        version: int,
+        status: T.Optional[str] = None,
+        updated_at: T.Optional[str] = None,
+    ) -> "Entity":
+        """
+        Construct the item for one version of a document, encoding the
+        composite-key layout in a single place.
+        """
+        return cls(
+            pk=f"doc#{doc_id}",
+            sk=f"v#{version:06d}",
+            status=status,
+            updated_at=updated_at,
+        )
+
+    def print(self):
+        print(join_path(self.pk, self.sk))
+
+
+# touch the model once at import so its TableConnection — and the pooled
+# HTTP session underneath — exists before the first real operation; in a
+# fresh Lambda container this moves TCP+TLS setup and endpoint discovery
+# out of the first request. pynamodb builds the TableConnection itself
+# (there is no hook to hand it the module-level ``connect``), but it is
+# built exactly once and every later call on the model reuses it.
+Entity.exists()
+
+
+def ensure_table():
+    """
+    Create the table only if it is missing. ``create_table(wait=True)``
+    polls DescribeTable until ACTIVE, which costs seconds on every
+    process start; when the table is already there a single existence
+    check skips the whole wait loop.
+    """
+    if not Entity.exists():
+        Entity.create_table(wait=True)
+
+
+@dataclasses.dataclass(eq=False, repr=False)
+class BusinessOperation:
+    """
+    Implement all "User Interaction" and "Query Pattern" as methods.
+    """
+
+    # directories this session already proved (or created) — repeated
+    # parent-existence checks for them cost no I/O at all
+    _known_dirs: T.Set[str] = dataclasses.field(default_factory=lambda: {"/"})
+
+    @functools.cached_property
+    def _client(self):
+        # the raw botocore client under the shared connection, for paths
+        # where pynamodb's per-item model construction is pure overhead
+        return connect.client
+
+    def exists(self, paths: T.Iterable[str]) -> T.Dict[str, bool]:
+        """
+        Implement "Query Pattern": check many paths for existence in one
+        shot.
+
+        Paths already in the ``_known_dirs`` cache are answered locally;
+        the rest are resolved with a single ``Entity.batch_get`` call
+        (BatchGetItem, 100 keys per round-trip) instead of one GetItem per
+        path. Only the key attributes are projected — existence needs no
+        payload bytes on the wire and no attribute deserialization.
+        """
+        result = {}
+        unknown = []
+        for path in paths:
+            if path in self._known_dirs:
+                result[path] = True
+            else:
+                result[path] = False
+                unknown.append(path)
+        if unknown:
+            for entity in Entity.batch_get(
+                [split_path(path) for path in unknown],
+                attributes_to_get=["pk", "sk"],
+            ):
+                result[join_path(entity.pk, entity.sk)] = True
+        return result
+
+    def _make_entry(self, path: str, pk: str, sk: str):
+        """
+        Write the item for a new directory or file in one DynamoDB call.
+
+        When the parent directory is already proven by ``_known_dirs``, a
+        plain conditional PutItem does it. Otherwise the parent check rides
+        along as a ConditionCheck in the same TransactWriteItems call —
+        one round-trip either way, instead of a GetItem followed by a
+        conditional PutItem.
+        """
+        if pk in self._known_dirs:
+            try:
+                Entity(pk=pk, sk=sk).save(condition=~Entity.sk.exists())
+            except PutError as e:
+                if e.cause_response_code == "ConditionalCheckFailedException":
+                    raise FileExistsError(f"{path!r} already exists") from e
+                raise
+            return
+        parent_pk, parent_sk = split_path(pk)
+        try:
+            with pm.TransactWrite(connection=connect) as trans:
+                trans.condition_check(
+                    Entity,
+                    hash_key=parent_pk,
+                    range_key=parent_sk,
+                    condition=Entity.sk.exists(),
+                )
+                trans.save(Entity(pk=pk, sk=sk), condition=~Entity.sk.exists())
+        except TransactWriteError as e:
+            # the cancellation reasons line up with the transaction items,
+            # so we can tell "no parent" apart from "path taken"
+            reasons = e.cancellation_reasons
+            if reasons and reasons[0] is not None:
+                raise FileNotFoundError(
+                    f"parent directory {pk!r} does not exist"
+                ) from e
+            raise FileExistsError(f"{path!r} already exists") from e
+        self._known_dirs.add(pk)
+
+    def make_dir(self, path: str):
+        """
+        Implement "User Interaction": create a new directory; the parent
+        directory must exist, and the path must not be taken yet.
+        """
+        if not path.endswith("/"):
+            raise ValueError(f"a directory path has to end with '/', got {path!r}")
+        pk, sk = split_path(path)
+        self._make_entry(path, pk, sk)
+        self._known_dirs.add(path)
+
+    def make_file(self, path: str):
+        """
+        Implement "User Interaction": create a new file; the parent
+        directory must exist, and the path must not be taken yet.
+        """
+        if path.endswith("/"):
+            raise ValueError(f"a file path must not end with '/', got {path!r}")
+        pk, sk = split_path(path)
+        self._make_entry(path, pk, sk)
+
+    def seed(self, rows: T.Iterable[Entity]):
+        """
+        Bulk-load prefabricated rows through ``Entity.batch_write()`` —
+        BatchWriteItem under the hood, 25 rows per round-trip with
+        automatic chunking and retry of unprocessed items. Same WCU as
+        saving one by one, a fraction of the round-trips.
+        """
+        with Entity.batch_write() as batch:
+            for row in rows:
+                batch.save(row)
+
+    def put_raw(self, pk: str, sk: str):
+        """
+        Write a bare (pk, sk) row through pynamodb's low-level
+        TableConnection, skipping Entity construction entirely — no
+        descriptor walk, no per-attribute validation, no serializer
+        round-trip. Worth it only on bulk paths that write thousands of
+        prefabricated rows; regular operations keep the model layer.
+        """
+        Entity._get_connection().put_item(pk, range_key=sk)
+
+    def get_many(self, keys: T.Iterable[T.Tuple[str, str]]) -> T.Iterator[Entity]:
+        """
+        Implement "Query Pattern": fetch a known set of (pk, sk) items in
+        bulk via ``Entity.batch_get`` — one BatchGetItem round-trip per
+        100 keys instead of one GetItem per key, which matters because
+        point reads are latency-bound, not throughput-bound. pynamodb
+        chunks and retries unprocessed keys automatically.
+        """
+        return Entity.batch_get(list(keys))
+
+    def new_doc_version(
+        self,
+        doc_id: str,
+        version: int,
+        status: T.Optional[str] = None,
+        updated_at: T.Optional[str] = None,
+    ):
+        """
+        Implement "User Interaction": record one new version of a document.
+        """
+        Entity.doc(doc_id, version, status=status, updated_at=updated_at).save()
+
+    def list_doc_versions(self, doc_id: str) -> T.Iterator[Entity]:
+        """
+        Implement "Query Pattern": a document's version history, in
+        version order, via a single partition Query — O(versions), not
+        O(table), because the versions share ``pk = "doc#<doc_id>"`` and
+        sort by the zero-padded ``sk``.
+        """
+        return Entity.query(hash_key=f"doc#{doc_id}")
+
+    def list_by_status(self, status: str) -> T.Iterator[Entity]:
+        """
+        Implement "Query Pattern": all document versions with a given
+        status across the whole table, newest ``updated_at`` last, via
+        the sparse ``by-status-index`` — O(matches) where a base-table
+        pass with a filter would read every item.
+        """
+        return Entity.by_status_index.query(hash_key=status)
+
+    def listdir(self, dir_path: str) -> T.Iterator[Entity]:
+        """
+        Implement "Query Pattern": list the direct children of a directory
+        with a single Query on its partition.
+        """
+        return Entity.query(hash_key=dir_path)
+
+    def print_all(
+        self,
+        root_pk: T.Optional[str] = None,
+        sk_prefix: T.Optional[str] = None,
+        filter_condition=None,
+        warn_on_scan: bool = True,
+    ):
+        """
+        Print items, preferably scoped to one directory partition.
+
+        With ``root_pk`` this is a targeted Query — DynamoDB jumps
+        straight to the partition and bills only the matched items —
+        optionally narrowed further with a ``begins_with`` sort-key
+        condition via ``sk_prefix``. Without it we fall back to a
+        full-table Scan, which reads (and bills) every item in the
+        table; that is an admin-export tool, not a query pattern, so it
+        warns unless ``warn_on_scan=False`` says you meant it.
+
+        ``filter_condition`` (a pynamodb condition on non-key attributes)
+        is pushed down to the store as a FilterExpression: non-matching
+        rows are dropped server-side, before payload bytes and Python
+        predicate work — RCU is still billed on rows read.
+        """
+        if root_pk is not None:
+            if sk_prefix is None:
+                entities = Entity.query(
+                    hash_key=root_pk,
+                    filter_condition=filter_condition,
+                    attributes_to_get=["pk", "sk"],
+                )
+            else:
+                entities = Entity.query(
+                    hash_key=root_pk,
+                    range_key_condition=Entity.sk.startswith(sk_prefix),
+                    filter_condition=filter_condition,
+                    attributes_to_get=["pk", "sk"],
+                )
+        else:
+            if warn_on_scan:
+                warnings.warn(
+                    "print_all without root_pk falls back to a full-table "
+                    "Scan; pass warn_on_scan=False if this is intended",
+                    stacklevel=2,
+                )
+            entities = self.scan_parallel(filter_condition=filter_condition)
+        # buffer up to a page of lines per stdout write: one syscall and
+        # one lock acquisition per flush instead of per item
+        write = sys.stdout.write
+        buf = []
+        for entity in entities:
+            buf.append(join_path(entity.pk, entity.sk))
+            if len(buf) >= 1000:
+                write("\n".join(buf) + "\n")
+                buf.clear()
+        if buf:
+            write("\n".join(buf) + "\n")
+
+    def iter_entities(self) -> T.Iterator[Entity]:
+        """
+        Stream every item lazily, one page in memory at a time.
+
+        Two ways to walk the whole table:
+
+        1. this generator — peak RSS stays O(page size) and the caller
+           can break early, but pages arrive sequentially;
+        2. :meth:`scan_parallel` — segments fetched concurrently for
+           wall-clock speed, at the price of materializing the results.
+
+        Prefer this one when the consumer is itself streaming (piping to
+        stdout, writing to a file) or may stop early.
+        """
+        yield from Entity.scan(attributes_to_get=["pk", "sk"], page_size=1000)
+
+    def scan_parallel(
+        self,
+        total_segments: int = 8,
+        filter_condition=None,
+    ) -> T.Iterator[Entity]:
+        """
+        Full-table pass split into ``total_segments`` server-side scan
+        segments, one worker thread each. Scan is I/O-bound on the HTTP
+        round-trips, so concurrent segments cut wall-clock roughly by the
+        segment count; the billed RCU is the same as a sequential scan.
+
+        Results are materialized per segment and chained, so the caller
+        prints from a single thread — no interleaved stdout.
+        """
+        with ThreadPoolExecutor(max_workers=total_segments) as executor:
+            futures = [
+                executor.submit(
+                    self._scan_segment, segment, total_segments, filter_condition
+                )
+                for segment in range(total_segments)
+            ]
+            entities = list(
+                itertools.chain.from_iterable(
+                    future.result() for future in as_completed(futures)
+                )
+            )
+        return iter(entities)
+
+    def print_all_fast(self):
+        """
+        The admin-export dump without the ORM: iterate boto3's scan
+        paginator and print straight from the raw DynamoDB-JSON dicts.
+
+        Each row skips ``Model.__init__``, attribute descriptor reads and
+        validation — on a dump that only touches two strings per item,
+        that per-row constant is most of the loop.
+        """
+        # local aliases: one LOAD_FAST per row instead of a global +
+        # attribute lookup inside the hot loop
+        _jp = join_path
+        write = sys.stdout.write
+        paginator = self._client.get_paginator("scan")
+        pages = paginator.paginate(
+            TableName=Entity.Meta.table_name,
+            ProjectionExpression="pk,sk",
+            PaginationConfig={"PageSize": 1000},
+        )
+        _root = ROOT
+        for page in pages:
+            items = page["Items"]
+            if not items:
+                continue
+            # the join is inlined rather than calling join_path: at this
+            # point every remaining cycle per row is a Python function
+            # call or attribute lookup, and the loop body below compiles
+            # to straight-line LOAD_FAST bytecode
+            lines = []
+            append = lines.append
+            for item in items:
+                pk = item["pk"]["S"]
+                sk = item["sk"]["S"]
+                append(pk if sk == _root else pk + sk)
+            # one buffered write per page, not one print per row
+            write("\n".join(lines) + "\n")
+
+    @staticmethod
+    def _scan_segment(
+        segment: int,
+        total_segments: int,
+        filter_condition=None,
+    ) -> T.List[Entity]:
+        # printing needs only the keys; the projection keeps payload and
+        # deserialization proportional to pk/sk even as items grow fields
+        return list(
+            Entity.scan(
+                segment=segment,
+                total_segments=total_segments,
+                filter_condition=filter_condition,
+                attributes_to_get=["pk", "sk"],
+                # tiny keys-only items: pack pages toward the 1 MB response
+                # cap instead of paying a round-trip per default-size page
+                page_size=1000,
+            )
+        )
+
+
+# ------------------------------------------------------------------------------
+# Setup Dummy Data
+# ------------------------------------------------------------------------------
+# Create DynamoDB table and index if not exists
+ensure_table()
+
+# Clean up existing dummy data before testing
+Entity.delete_all()
+
+op = BusinessOperation()
+
+op.put_raw("/", ROOT)
+
+print("--- seed a sample tree ---")
+op.make_dir("/docs/")
+op.make_dir("/docs/guide/")
+op.make_file("/docs/guide/intro.txt")
+op.make_file("/docs/guide/setup.txt")
+op.make_dir("/images/")
+op.make_file("/images/logo.png")
+op.make_file("/README.txt")
+
+# ------------------------------------------------------------------------------
+# Test Query Patterns
+# ------------------------------------------------------------------------------
+print("--- listdir /docs/guide/ ---")
+names = set()
+for entity in op.listdir("/docs/guide/"):
+    entity.print()
+    names.add(entity.sk)
+assert names == {"intro.txt", "setup.txt"}
+
+print("--- exists ---")
+res = op.exists(["/docs/", "/docs/guide/intro.txt", "/docs/nope.txt"])
+print(res)
+assert res == {
+    "/docs/": True,
+    "/docs/guide/intro.txt": True,
+    "/docs/nope.txt": False,
+}
+
+print("--- /docs/guide/ partition only (targeted query) ---")
+op.print_all(root_pk="/docs/guide/")
+
+print("--- get_many ---")
+res = sorted(
+    join_path(e.pk, e.sk)
+    for e in op.get_many([split_path("/README.txt"), split_path("/images/logo.png")])
+)
+print(res)
+assert res == ["/README.txt", "/images/logo.png"]
+
+print("--- document version history ---")
+op.seed(
+    [
+        Entity.doc("d-1", 1, status="archived", updated_at="2026-08-01"),
+        Entity.doc("d-1", 2, status="archived", updated_at="2026-08-10"),
+        Entity.doc("d-1", 10, status="published", updated_at="2026-08-27"),
+        Entity.doc("d-2", 1, status="published", updated_at="2026-08-20"),
+    ]
+)
+versions = [e.sk for e in op.list_doc_versions("d-1")]
+print(versions)
+assert versions == ["v#000001", "v#000002", "v#000010"]
+
+print("--- published versions across documents ---")
+published = [(e.pk, e.sk) for e in op.list_by_status("published")]
+print(published)
+assert published == [("doc#d-2", "v#000001"), ("doc#d-1", "v#000010")]
+
+print("--- everything in the table ---")
+op.print_all(warn_on_scan=False)
+
+print("--- everything in the table, raw client ---")
+op.print_all_fast()
+
+if USE_MOTO:
+    mock.stop()  # stop mocking DynamoDB